@@ -1,14 +1,17 @@
 """
 Flask Application for Skin Condition Analysis
 """
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template
 from flask_cors import CORS
-import numpy as np
-import cv2
 import base64
+import hashlib
+import json
 import os
 import logging
-from services.skin_condition import get_skin_condition_service
+import threading
+from collections import OrderedDict
+from services.skin_condition import get_skin_condition_service, decode_image_bytes, warm_up_skin_detection
+from services.batched_predictor import get_batched_predictor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,6 +22,125 @@ CORS(app)
 
 # Initialize the skin condition service
 skin_service = get_skin_condition_service()
+# Coalesces concurrent analyze requests into batched model calls (if PREDICTION_MAX_BATCH > 1)
+batcher = get_batched_predictor()
+
+# Seconds a request waits for its batched prediction
+PREDICTION_TIMEOUT = 30
+
+# LRU cache of analysis responses keyed by a hash of the uploaded bytes,
+# so retries and resends skip decoding and inference
+PREDICTION_CACHE_SIZE = 512
+_prediction_cache: "OrderedDict[bytes, dict]" = OrderedDict()
+_prediction_cache_lock = threading.Lock()
+
+def _image_cache_key(image_bytes: bytes) -> bytes:
+    """Hash the raw image bytes into a prediction cache key"""
+    return hashlib.blake2b(image_bytes, digest_size=16).digest()
+
+def _get_cached_prediction(key: bytes):
+    """Return a cached response and mark it as recently used, or None"""
+    with _prediction_cache_lock:
+        response = _prediction_cache.get(key)
+        if response is not None:
+            _prediction_cache.move_to_end(key)
+        return response
+
+def _cache_prediction(key: bytes, response: dict):
+    """Store a response, evicting the least recently used one when full"""
+    with _prediction_cache_lock:
+        _prediction_cache[key] = response
+        _prediction_cache.move_to_end(key)
+        if len(_prediction_cache) > PREDICTION_CACHE_SIZE:
+            _prediction_cache.popitem(last=False)
+
+# Skincare recommendations per detected condition, built once at import
+_RECOMMENDATIONS = {
+    "acne": {
+        "description": "Acne is caused by clogged pores from oil, dead skin cells, and bacteria.",
+        "tips": [
+            "Use a gentle, non-comedogenic cleanser twice daily",
+            "Apply benzoyl peroxide or salicylic acid treatments",
+            "Avoid touching your face frequently",
+            "Use oil-free moisturizers and sunscreen",
+            "Consider consulting a dermatologist for persistent acne"
+        ],
+        "ingredients_to_look_for": ["Salicylic Acid", "Benzoyl Peroxide", "Niacinamide", "Tea Tree Oil"],
+        "ingredients_to_avoid": ["Heavy oils", "Comedogenic ingredients", "Alcohol-based products"]
+    },
+    "dry": {
+        "description": "Dry skin lacks moisture and natural oils, leading to flakiness and tightness.",
+        "tips": [
+            "Use a gentle, hydrating cleanser",
+            "Apply a rich moisturizer immediately after washing",
+            "Use a humidifier in dry environments",
+            "Avoid hot showers and harsh soaps",
+            "Drink plenty of water to stay hydrated"
+        ],
+        "ingredients_to_look_for": ["Hyaluronic Acid", "Ceramides", "Glycerin", "Shea Butter"],
+        "ingredients_to_avoid": ["Alcohol", "Fragrances", "Harsh sulfates"]
+    },
+    "pigmentation": {
+        "description": "Hyperpigmentation is darkening of skin areas due to excess melanin production.",
+        "tips": [
+            "Use broad-spectrum SPF 30+ sunscreen daily",
+            "Apply vitamin C serum in the morning",
+            "Use products with niacinamide or arbutin",
+            "Consider chemical exfoliants like AHAs",
+            "Be patient - results take 6-8 weeks minimum"
+        ],
+        "ingredients_to_look_for": ["Vitamin C", "Niacinamide", "Alpha Arbutin", "Kojic Acid"],
+        "ingredients_to_avoid": ["Harsh physical scrubs", "Irritating ingredients"]
+    },
+    "wrinkle": {
+        "description": "Wrinkles are creases in the skin caused by aging, sun damage, and loss of collagen.",
+        "tips": [
+            "Use retinol or retinoid products at night",
+            "Apply SPF 30+ sunscreen every day",
+            "Keep skin well-hydrated with hyaluronic acid",
+            "Consider peptide-rich products",
+            "Get adequate sleep and manage stress"
+        ],
+        "ingredients_to_look_for": ["Retinol", "Peptides", "Hyaluronic Acid", "Vitamin C"],
+        "ingredients_to_avoid": ["Excessive sun exposure", "Smoking", "Harsh products"]
+    },
+    "dark circles": {
+        "description": "Dark circles under the eyes can be caused by fatigue, genetics, or aging.",
+        "tips": [
+            "Get 7-9 hours of quality sleep",
+            "Use eye creams with caffeine or vitamin K",
+            "Apply cold compresses to reduce puffiness",
+            "Stay hydrated and limit salt intake",
+            "Use concealer with peach or orange undertones"
+        ],
+        "ingredients_to_look_for": ["Caffeine", "Vitamin K", "Retinol", "Peptides"],
+        "ingredients_to_avoid": ["Rubbing eyes", "Allergens", "Excessive screen time before bed"]
+    },
+    "normal": {
+        "description": "Your skin appears healthy and balanced. Keep up the good work!",
+        "tips": [
+            "Maintain your current skincare routine",
+            "Continue using sunscreen daily",
+            "Stay hydrated and eat a balanced diet",
+            "Get regular exercise and adequate sleep",
+            "Consider preventive anti-aging products"
+        ],
+        "ingredients_to_look_for": ["Antioxidants", "SPF", "Gentle cleansers", "Light moisturizers"],
+        "ingredients_to_avoid": ["Over-exfoliation", "Unnecessary harsh treatments"]
+    }
+}
+
+# Conditions the model can detect
+_CONDITIONS = [
+    {"id": "acne", "name": "Acne", "description": "Inflammatory skin condition with pimples and blemishes"},
+    {"id": "dry", "name": "Dry Skin", "description": "Skin that lacks moisture and natural oils"},
+    {"id": "pigmentation", "name": "Pigmentation", "description": "Dark spots or uneven skin tone"},
+    {"id": "wrinkle", "name": "Wrinkles", "description": "Lines and creases in the skin"},
+    {"id": "dark_circles", "name": "Dark Circles", "description": "Darkening under the eyes"},
+    {"id": "normal", "name": "Normal/Healthy", "description": "Balanced, healthy-looking skin"}
+]
+# The conditions list is static, so its JSON body is serialized once
+_CONDITIONS_BODY = json.dumps({"conditions": _CONDITIONS}).encode()
 
 @app.route('/')
 def index():
@@ -39,53 +161,61 @@ def analyze_skin():
     Analyze skin condition from uploaded image
     
     Accepts:
+    - Raw image bytes as the body (application/octet-stream or image/*)
     - Multipart form data with 'image' file
     - JSON with base64 encoded 'image' data
     """
     try:
         # Get image from request
-        if 'image' in request.files:
+        if request.mimetype == 'application/octet-stream' or request.mimetype.startswith('image/'):
+            # Handle raw binary body: no multipart or base64 decoding needed
+            image_bytes = request.get_data(cache=False)
+            if not image_bytes:
+                return jsonify({"error": "No image provided"}), 400
+            
+        elif 'image' in request.files:
             # Handle file upload
             file = request.files['image']
             if file.filename == '':
                 return jsonify({"error": "No file selected"}), 400
             
-            # Read image file
-            file_bytes = np.frombuffer(file.read(), np.uint8)
-            bgr_image = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+            # Read image file (np.frombuffer wraps the bytes without copying)
+            image_bytes = file.read()
             
         elif request.is_json and 'image' in request.json:
             # Handle base64 encoded image
             image_data = request.json['image']
             # Remove data URL prefix if present
-            if ',' in image_data:
-                image_data = image_data.split(',')[1]
+            image_data = image_data.rpartition(',')[2]
             
             # Decode base64
             image_bytes = base64.b64decode(image_data)
-            file_bytes = np.frombuffer(image_bytes, np.uint8)
-            bgr_image = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
         else:
             return jsonify({"error": "No image provided"}), 400
         
+        # Identical uploads return the cached analysis
+        cache_key = _image_cache_key(image_bytes)
+        cached_response = _get_cached_prediction(cache_key)
+        if cached_response is not None:
+            return jsonify(cached_response)
+        
+        bgr_image = decode_image_bytes(image_bytes)
         if bgr_image is None:
             return jsonify({"error": "Invalid image format"}), 400
         
-        # Convert BGR to RGB for the model
-        rgb_image = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2RGB)
-        
-        # Get predictions
-        probabilities = skin_service.predict_classes(rgb_image)
+        # Get predictions (the service converts to RGB after resizing)
+        probabilities = batcher.submit(bgr_image).result(timeout=PREDICTION_TIMEOUT)
         results = skin_service.get_predictions_dict(probabilities)
         
         # Format response
         response = {
             "success": True,
-            "top_condition": results["top_condition"].strip(),
-            "confidence": round(results["confidence"], 2),
-            "all_conditions": {k.strip(): round(v, 2) for k, v in results["all_conditions"].items()},
-            "recommendations": get_recommendations(results["top_condition"].strip())
+            "top_condition": results["top_condition"],
+            "confidence": results["confidence"],
+            "all_conditions": results["all_conditions"],
+            "recommendations": get_recommendations(results["top_condition"])
         }
+        _cache_prediction(cache_key, response)
         
         return jsonify(response)
         
@@ -98,98 +228,18 @@ def analyze_skin():
 
 def get_recommendations(condition: str) -> dict:
     """Get skincare recommendations based on detected condition"""
-    recommendations = {
-        "acne": {
-            "description": "Acne is caused by clogged pores from oil, dead skin cells, and bacteria.",
-            "tips": [
-                "Use a gentle, non-comedogenic cleanser twice daily",
-                "Apply benzoyl peroxide or salicylic acid treatments",
-                "Avoid touching your face frequently",
-                "Use oil-free moisturizers and sunscreen",
-                "Consider consulting a dermatologist for persistent acne"
-            ],
-            "ingredients_to_look_for": ["Salicylic Acid", "Benzoyl Peroxide", "Niacinamide", "Tea Tree Oil"],
-            "ingredients_to_avoid": ["Heavy oils", "Comedogenic ingredients", "Alcohol-based products"]
-        },
-        "dry": {
-            "description": "Dry skin lacks moisture and natural oils, leading to flakiness and tightness.",
-            "tips": [
-                "Use a gentle, hydrating cleanser",
-                "Apply a rich moisturizer immediately after washing",
-                "Use a humidifier in dry environments",
-                "Avoid hot showers and harsh soaps",
-                "Drink plenty of water to stay hydrated"
-            ],
-            "ingredients_to_look_for": ["Hyaluronic Acid", "Ceramides", "Glycerin", "Shea Butter"],
-            "ingredients_to_avoid": ["Alcohol", "Fragrances", "Harsh sulfates"]
-        },
-        "pigmentation": {
-            "description": "Hyperpigmentation is darkening of skin areas due to excess melanin production.",
-            "tips": [
-                "Use broad-spectrum SPF 30+ sunscreen daily",
-                "Apply vitamin C serum in the morning",
-                "Use products with niacinamide or arbutin",
-                "Consider chemical exfoliants like AHAs",
-                "Be patient - results take 6-8 weeks minimum"
-            ],
-            "ingredients_to_look_for": ["Vitamin C", "Niacinamide", "Alpha Arbutin", "Kojic Acid"],
-            "ingredients_to_avoid": ["Harsh physical scrubs", "Irritating ingredients"]
-        },
-        "wrinkle": {
-            "description": "Wrinkles are creases in the skin caused by aging, sun damage, and loss of collagen.",
-            "tips": [
-                "Use retinol or retinoid products at night",
-                "Apply SPF 30+ sunscreen every day",
-                "Keep skin well-hydrated with hyaluronic acid",
-                "Consider peptide-rich products",
-                "Get adequate sleep and manage stress"
-            ],
-            "ingredients_to_look_for": ["Retinol", "Peptides", "Hyaluronic Acid", "Vitamin C"],
-            "ingredients_to_avoid": ["Excessive sun exposure", "Smoking", "Harsh products"]
-        },
-        "dark circles": {
-            "description": "Dark circles under the eyes can be caused by fatigue, genetics, or aging.",
-            "tips": [
-                "Get 7-9 hours of quality sleep",
-                "Use eye creams with caffeine or vitamin K",
-                "Apply cold compresses to reduce puffiness",
-                "Stay hydrated and limit salt intake",
-                "Use concealer with peach or orange undertones"
-            ],
-            "ingredients_to_look_for": ["Caffeine", "Vitamin K", "Retinol", "Peptides"],
-            "ingredients_to_avoid": ["Rubbing eyes", "Allergens", "Excessive screen time before bed"]
-        },
-        "normal": {
-            "description": "Your skin appears healthy and balanced. Keep up the good work!",
-            "tips": [
-                "Maintain your current skincare routine",
-                "Continue using sunscreen daily",
-                "Stay hydrated and eat a balanced diet",
-                "Get regular exercise and adequate sleep",
-                "Consider preventive anti-aging products"
-            ],
-            "ingredients_to_look_for": ["Antioxidants", "SPF", "Gentle cleansers", "Light moisturizers"],
-            "ingredients_to_avoid": ["Over-exfoliation", "Unnecessary harsh treatments"]
-        }
-    }
-    
-    return recommendations.get(condition.lower(), recommendations["normal"])
+    return _RECOMMENDATIONS.get(condition.lower(), _RECOMMENDATIONS["normal"])
 
 @app.route('/api/conditions', methods=['GET'])
 def get_conditions():
     """Get list of detectable skin conditions"""
-    conditions = [
-        {"id": "acne", "name": "Acne", "description": "Inflammatory skin condition with pimples and blemishes"},
-        {"id": "dry", "name": "Dry Skin", "description": "Skin that lacks moisture and natural oils"},
-        {"id": "pigmentation", "name": "Pigmentation", "description": "Dark spots or uneven skin tone"},
-        {"id": "wrinkle", "name": "Wrinkles", "description": "Lines and creases in the skin"},
-        {"id": "dark_circles", "name": "Dark Circles", "description": "Darkening under the eyes"},
-        {"id": "normal", "name": "Normal/Healthy", "description": "Balanced, healthy-looking skin"}
-    ]
-    return jsonify({"conditions": conditions})
+    response = Response(_CONDITIONS_BODY, mimetype='application/json')
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response
 
 if __name__ == '__main__':
     # Pre-load the model
+    warm_up_skin_detection()
     logger.info("Pre-loading skin condition model...")
     try:
         skin_service.load_model()
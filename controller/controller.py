@@ -2,7 +2,7 @@
 Controller for Skin Condition Analysis
 Provides a clean interface for the skin analysis service
 """
-from services.skin_condition import get_skin_condition_service, SkinConditionService
+from services.skin_condition import get_skin_condition_service, SkinConditionService, decode_image_bytes
 import numpy as np
 import cv2
 from typing import Dict, Any, Optional
@@ -47,18 +47,15 @@ class SkinController:
         Returns:
             Dictionary containing analysis results
         """
-        # Convert BGR to RGB for the model
-        rgb_image = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2RGB)
-        
-        # Get predictions from service
-        probabilities = self.service.predict_classes(rgb_image)
+        # Get predictions from service (converted to RGB after resizing)
+        probabilities = self.service.predict_classes(bgr_image)
         results = self.service.get_predictions_dict(probabilities)
         
         return {
             "success": True,
-            "top_condition": results["top_condition"].strip(),
-            "confidence": round(results["confidence"], 2),
-            "all_conditions": {k.strip(): round(v, 2) for k, v in results["all_conditions"].items()},
+            "top_condition": results["top_condition"],
+            "confidence": results["confidence"],
+            "all_conditions": results["all_conditions"],
             "predictions_list": results["condition_list"]
         }
     
@@ -67,14 +64,13 @@ class SkinController:
         Analyze a skin image from raw bytes
         
         Args:
-            image_bytes: Raw image bytes
+            image_bytes: Raw image bytes (bytes or bytearray, wrapped without copying)
             
         Returns:
             Dictionary containing analysis results
         """
-        # Decode image from bytes
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        bgr_image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        # Decode image from bytes (downscaled while decoding if large)
+        bgr_image = decode_image_bytes(image_bytes)
         
         if bgr_image is None:
             raise ValueError("Could not decode image from bytes")
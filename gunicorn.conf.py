@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration for the skin condition API
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+
+# One worker process per core, with threads so micro-batching can coalesce requests
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = 60
+
+# Import the app once in the master; workers share its memory copy-on-write
+preload_app = True
+
+# Every core already runs a worker, so keep each interpreter single-threaded
+os.environ.setdefault("MODEL_NUM_THREADS", "1")
+
+def on_starting(server):
+    """Convert the model once in the master so workers don't race to do it"""
+    from services.skin_condition import get_skin_condition_service
+    get_skin_condition_service().prepare_tflite_model()
+
+def post_fork(server, worker):
+    """Load the interpreter in each worker; its thread pool does not survive fork"""
+    from services.skin_condition import get_skin_condition_service, warm_up_skin_detection
+    warm_up_skin_detection()
+    try:
+        get_skin_condition_service().load_model()
+    except Exception as e:
+        worker.log.error(f"Failed to pre-load model: {e}")
@@ -0,0 +1,119 @@
+"""
+Micro-batching for concurrent skin condition predictions.
+Coalesces in-flight requests into a single model invocation.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+
+import numpy as np
+
+from services.skin_condition import get_skin_condition_service, SkinConditionService, MODEL_INPUT_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Largest batch handed to the model in one call. Defaults to 1 (batching
+# off): with single-threaded interpreters per-image cost does not drop with
+# batch size, so the queue hand-off only adds latency
+MAX_BATCH = int(os.environ.get("PREDICTION_MAX_BATCH", 1))
+# How long the worker waits for more requests after the first one arrives
+MAX_WAIT_MS = 5
+
+class BatchedPredictor:
+    """Collects preprocessed images from request threads and predicts them in batches"""
+    
+    def __init__(self, service: SkinConditionService, max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS):
+        self.service = service
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._batch_buffer = np.empty((max_batch, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE, 3), dtype=np.float32)
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+    
+    def _ensure_worker(self):
+        """Start the worker thread on first use (after any fork by the WSGI server)"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="batched-predictor", daemon=True)
+                self._worker.start()
+    
+    def submit(self, bgr_image: np.ndarray) -> Future:
+        """
+        Queue a BGR image for prediction
+        
+        Skin detection and preprocessing run in the calling thread, so a
+        ValueError for images without skin is raised here rather than from the future.
+        
+        Returns:
+            Future resolving to the probabilities for this image
+        """
+        # Thread-local tile; it stays untouched while this thread waits on the future
+        preprocessed_img = self.service.prepare_input(bgr_image)
+        
+        future: Future = Future()
+        if self.max_batch == 1:
+            # Batching disabled: predict inline, skipping the worker hand-off
+            future.set_result(self.service.run_inference(preprocessed_img)[0])
+            return future
+        
+        self._ensure_worker()
+        self._queue.put((preprocessed_img, future))
+        return future
+    
+    def _collect_batch(self) -> list:
+        """Block for one request, then gather more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        return batch
+    
+    def _run(self):
+        """Worker loop: run the model once per collected batch"""
+        while True:
+            batch = self._collect_batch()
+            futures = [future for _, future in batch]
+            
+            try:
+                for i, (preprocessed_img, _) in enumerate(batch):
+                    self._batch_buffer[i] = preprocessed_img[0]
+                preds = self.service.run_inference(self._batch_buffer[:len(batch)])
+            except Exception as e:
+                logger.error(f"Batched inference failed: {str(e)}")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            
+            for future, probabilities in zip(futures, preds):
+                future.set_result(probabilities)
+
+
+# Singleton instance
+_batched_predictor: Optional[BatchedPredictor] = None
+_batched_predictor_lock = threading.Lock()
+
+def get_batched_predictor() -> BatchedPredictor:
+    """Get the shared batched predictor for the skin condition service"""
+    global _batched_predictor
+    if _batched_predictor is None:
+        with _batched_predictor_lock:
+            if _batched_predictor is None:
+                _batched_predictor = BatchedPredictor(get_skin_condition_service())
+    return _batched_predictor
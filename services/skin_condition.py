@@ -1,39 +1,230 @@
 import numpy as np
 import tensorflow as tf
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import os
+import threading
+import io
 import cv2
+from PIL import Image
+
+# Optional GPU JPEG decoding (nvJPEG via torchvision) on CUDA hosts
+try:
+    import torch
+    import torch.nn.functional as F
+    from torchvision.io import decode_jpeg, ImageReadMode
+    TORCHVISION_AVAILABLE = True
+except ImportError:
+    TORCHVISION_AVAILABLE = False
+
+# Optional JIT-compiled skin pixel counting
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Longest side used for skin detection; only the skin ratio matters, not resolution
+SKIN_DETECTION_MAX_SIDE = 256
+
+# Random pixels checked before a full skin scan. At exactly 1% skin about 10
+# of them are expected: none is a confident "no", twice that a confident "yes"
+SKIN_SAMPLE_SIZE = 1024
+SKIN_SAMPLE_PRESENT_MIN = 21
+# Sampling generator, created once per process (keyed by pid) so forked
+# workers don't inherit the same state and sample identical pixels
+_skin_sample_rng_state = (None, None)
+
+# Define skin color range in HSV
+# These ranges work for most skin tones: hue 0-20 or 170-180, S >= 20, V >= 70
+SKIN_HUE_LOW_MAX = 20
+SKIN_HUE_HIGH_MIN = 170
+SKIN_SATURATION_MIN = 20
+SKIN_VALUE_MIN = 70
+
+SKIN_HUE_LUT = np.zeros(256, dtype=np.uint8)
+SKIN_HUE_LUT[:SKIN_HUE_LOW_MAX + 1] = 255
+SKIN_HUE_LUT[SKIN_HUE_HIGH_MIN:] = 255
+SKIN_HSV_LOWER = np.array([0, SKIN_SATURATION_MIN, SKIN_VALUE_MIN], dtype=np.uint8)
+SKIN_HSV_UPPER = np.array([255, 255, 255], dtype=np.uint8)
+
+if NUMBA_AVAILABLE:
+    # Serial on purpose: inputs are at most 256x256 pixels, and a parallel
+    # kernel needs a threading layer that is neither fork- nor thread-safe
+    # under gunicorn (GNU OpenMP / workqueue)
+    @njit(cache=True)
+    def count_skin_pixels(hsv_flat):
+        """Count skin pixels in an (N, 3) uint8 HSV array without building any masks"""
+        count = 0
+        for i in range(hsv_flat.shape[0]):
+            h = hsv_flat[i, 0]
+            s = hsv_flat[i, 1]
+            v = hsv_flat[i, 2]
+            # Branchless predicate so the loop vectorizes
+            count += ((s >= SKIN_SATURATION_MIN) & (v >= SKIN_VALUE_MIN)
+                      & ((h <= SKIN_HUE_LOW_MAX) | (h >= SKIN_HUE_HIGH_MIN)))
+        return count
+
+def warm_up_skin_detection():
+    """Compile (or load from cache) the Numba kernel so no request pays the JIT cost"""
+    if NUMBA_AVAILABLE:
+        count_skin_pixels(np.zeros((1, 3), dtype=np.uint8))
+
+# Compressed JPEG uploads above this size are decoded at half resolution
+REDUCED_DECODE_MIN_BYTES = 200_000
+# Model input size; reduced decodes smaller than this are redone at full size
+MODEL_INPUT_SIZE = 224
+# Batch sizes with a dedicated interpreter; other batches are split into these
+INFERENCE_BATCH_SIZES = (1, 2, 4, 8)
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+
+# CUDA availability, probed once per process (keyed by pid)
+_gpu_jpeg_decode_state = (None, False)
+
+def _gpu_jpeg_decode_available() -> bool:
+    """
+    Check lazily whether JPEGs can be decoded on the GPU.
+    The probe runs in the process that decodes, so a gunicorn master that
+    preloads the app never touches CUDA before forking its workers.
+    """
+    global _gpu_jpeg_decode_state
+    pid, available = _gpu_jpeg_decode_state
+    if pid != os.getpid():
+        available = TORCHVISION_AVAILABLE and torch.cuda.is_available()
+        _gpu_jpeg_decode_state = (os.getpid(), available)
+    return available
+
+EXIF_ORIENTATION_TAG = 0x0112
+
+def _jpeg_exif_orientation(file_bytes: np.ndarray) -> int:
+    """Read the EXIF orientation tag of a JPEG (1 = upright) without decoding pixels"""
+    try:
+        with Image.open(io.BytesIO(file_bytes)) as img:
+            return img.getexif().get(EXIF_ORIENTATION_TAG, 1)
+    except Exception:
+        return 1
+
+def _decode_jpeg_on_gpu(file_bytes: np.ndarray) -> np.ndarray:
+    """
+    Decode a JPEG with nvJPEG and downscale it on the GPU.
+    Only the downscaled BGR image is copied back to the host.
+    """
+    data = torch.from_numpy(file_bytes.copy())
+    rgb = decode_jpeg(data, mode=ImageReadMode.RGB, device="cuda")  # CHW uint8
+    
+    # Keep the shorter side at no less than twice the model input size
+    scale = 2 * MODEL_INPUT_SIZE / min(rgb.shape[1:])
+    if scale < 1.0:
+        size = (round(rgb.shape[1] * scale), round(rgb.shape[2] * scale))
+        rgb = F.interpolate(rgb[None].float(), size=size, mode="area")[0]
+        rgb = rgb.round_().clamp_(0, 255).to(torch.uint8)
+    
+    # RGB CHW -> BGR HWC for the OpenCV-based pipeline
+    return rgb.flip(0).permute(1, 2, 0).contiguous().cpu().numpy()
+
+def decode_image_bytes(image_bytes) -> Optional[np.ndarray]:
+    """
+    Decode encoded image bytes into a BGR array (OpenCV format).
+    Large JPEG uploads are downscaled during decoding, since the model only needs 224x224.
+    Upright JPEGs are decoded on the GPU when torchvision and a CUDA device are available.
+    Returns None if the bytes cannot be decoded.
+    """
+    file_bytes = np.frombuffer(image_bytes, np.uint8)
+    is_jpeg = bytes(file_bytes[:3]) == JPEG_MAGIC
+    
+    # decode_jpeg ignores EXIF orientation on CUDA, while cv2.imdecode applies it,
+    # so rotated photos go through the CPU path to reach the model upright
+    if is_jpeg and _gpu_jpeg_decode_available() and _jpeg_exif_orientation(file_bytes) == 1:
+        try:
+            return _decode_jpeg_on_gpu(file_bytes)
+        except RuntimeError as e:
+            logger.warning(f"GPU JPEG decoding failed, falling back to CPU: {str(e)}")
+    
+    if is_jpeg and len(file_bytes) > REDUCED_DECODE_MIN_BYTES:
+        # libjpeg can downscale in the DCT domain, which is much cheaper than a full decode.
+        # Other formats would be fully decoded and then resized, so they skip this
+        bgr_image = cv2.imdecode(file_bytes, cv2.IMREAD_REDUCED_COLOR_2)
+        if bgr_image is not None and min(bgr_image.shape[:2]) >= MODEL_INPUT_SIZE:
+            return bgr_image
+    
+    return cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+
+# Per-thread scratch buffers reused across requests
+_scratch = threading.local()
+
+def _scratch_buffer(name: str, shape: tuple, dtype) -> np.ndarray:
+    """Get a thread-local scratch array, reallocating only when the shape changes"""
+    buf = getattr(_scratch, name, None)
+    if buf is None or buf.shape != shape:
+        buf = np.empty(shape, dtype=dtype)
+        setattr(_scratch, name, buf)
+    return buf
+
+def _skin_sample_rng() -> np.random.Generator:
+    """Get this process's sampling generator, freshly seeded after a fork"""
+    global _skin_sample_rng_state
+    pid, rng = _skin_sample_rng_state
+    if pid != os.getpid():
+        rng = np.random.default_rng()
+        _skin_sample_rng_state = (os.getpid(), rng)
+    return rng
+
+def _sample_skin_pixels(bgr_image) -> int:
+    """Count skin pixels among SKIN_SAMPLE_SIZE randomly sampled pixels"""
+    h, w = bgr_image.shape[:2]
+    rng = _skin_sample_rng()
+    ys = rng.integers(0, h, SKIN_SAMPLE_SIZE)
+    xs = rng.integers(0, w, SKIN_SAMPLE_SIZE)
+    sample_hsv = cv2.cvtColor(bgr_image[ys, xs][np.newaxis], cv2.COLOR_BGR2HSV)[0]
+    
+    hue, sat, val = sample_hsv[:, 0], sample_hsv[:, 1], sample_hsv[:, 2]
+    is_skin = ((sat >= SKIN_SATURATION_MIN) & (val >= SKIN_VALUE_MIN)
+               & ((hue <= SKIN_HUE_LOW_MAX) | (hue >= SKIN_HUE_HIGH_MIN)))
+    return int(np.count_nonzero(is_skin))
+
 def detect_skin_in_image(bgr_image):
     """
     Simple skin detection function using HSV color space.
     Returns True if skin is detected, False otherwise.
     """
-    # Convert BGR to HSV
-    hsv = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2HSV)
+    # Most images are clearly skin or clearly not; decide those from a random
+    # sample and only scan the whole image when the sample is borderline
+    sampled_skin = _sample_skin_pixels(bgr_image)
+    if sampled_skin == 0:
+        return False
+    if sampled_skin >= SKIN_SAMPLE_PRESENT_MIN:
+        return True
     
-    # Define skin color range in HSV
-    # These ranges work for most skin tones
-    lower_skin1 = np.array([0, 20, 70], dtype=np.uint8)
-    upper_skin1 = np.array([20, 255, 255], dtype=np.uint8)
+    # Downsample large images first. Nearest-neighbour picks original pixels
+    # (a uniform subsample), so the skin ratio is preserved; area averaging
+    # would blend scattered skin pixels into non-skin colours
+    h, w = bgr_image.shape[:2]
+    scale = min(1.0, SKIN_DETECTION_MAX_SIDE / max(h, w))
+    if scale < 1.0:
+        h, w = max(1, round(h * scale)), max(1, round(w * scale))
+        small = _scratch_buffer("skin_bgr", (h, w, 3), np.uint8)
+        bgr_image = cv2.resize(bgr_image, (w, h), dst=small, interpolation=cv2.INTER_NEAREST)
     
-    lower_skin2 = np.array([170, 20, 70], dtype=np.uint8)
-    upper_skin2 = np.array([180, 255, 255], dtype=np.uint8)
+    # Convert BGR to HSV
+    hsv = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2HSV, dst=_scratch_buffer("skin_hsv", (h, w, 3), np.uint8))
     
-    # Create masks for skin detection
-    mask1 = cv2.inRange(hsv, lower_skin1, upper_skin1)
-    mask2 = cv2.inRange(hsv, lower_skin2, upper_skin2)
-    mask = cv2.bitwise_or(mask1, mask2)
+    if NUMBA_AVAILABLE:
+        # Check if skin pixels are present (at least 1% of image)
+        return count_skin_pixels(hsv.reshape(-1, 3)) > 0.01 * h * w
     
-    # Check if skin pixels are present (at least 1% of image)
-    skin_pixels = cv2.countNonZero(mask)
-    total_pixels = bgr_image.shape[0] * bgr_image.shape[1]
-    skin_ratio = skin_pixels / total_pixels
+    # Hue is the only channel with two bands; the S/V bounds are shared.
+    # The hue channel is mapped and masked in place
+    mask = cv2.extractChannel(hsv, 0, dst=_scratch_buffer("skin_mask", (h, w), np.uint8))
+    cv2.LUT(mask, SKIN_HUE_LUT, dst=mask)
+    sv_mask = cv2.inRange(hsv, SKIN_HSV_LOWER, SKIN_HSV_UPPER, dst=_scratch_buffer("skin_sv_mask", (h, w), np.uint8))
+    cv2.bitwise_and(mask, sv_mask, dst=mask)
     
-    return skin_ratio > 0.01  # At least 1% skin detected
+    # Check if skin pixels are present (at least 1% of image).
+    # The mask is 0/255, so a 1% skin ratio is a mean of 2.55
+    return cv2.mean(mask)[0] > 0.01 * 255
 
 class SkinConditionService:
     """Service for skin condition analysis using custom ML model"""
@@ -44,6 +235,24 @@ class SkinConditionService:
         current_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.dirname(current_dir)
         self.model_path = os.path.join(project_root, "model", "mobilenet_final.h5")
+        # Converted TFLite models, generated from the .h5 on first load
+        self.tflite_path = os.path.join(project_root, "model", "mobilenet_final.tflite")
+        self.int8_tflite_path = os.path.join(project_root, "model", "mobilenet_int8.tflite")
+        # Sample skin images used to calibrate int8 quantization
+        self.calibration_dir = os.path.join(project_root, "model", "calibration")
+        
+        # Interpreter tensor details (set in load_model)
+        self._input_index = None
+        self._output_index = None
+        self._input_quantization = None
+        # One allocated interpreter per batch size in INFERENCE_BATCH_SIZES,
+        # so changing batch sizes never re-plans tensors (batch 1 is _model)
+        self._tflite_model_path = None
+        self._interpreters = {}
+        # Guards one-time model loading across request threads
+        self._model_lock = threading.Lock()
+        # TFLite interpreters are not thread-safe
+        self._inference_lock = threading.Lock()
         
         # Label mapping for skin conditions - EXACT mapping from training
         self.index_to_label = {
@@ -54,73 +263,232 @@ class SkinConditionService:
             4: 'dark circles',
             5: 'normal'
         }
+        # Ordered, whitespace-stripped labels indexed like the model output
+        self._labels = tuple(label.strip() for label in self.index_to_label.values())
+    
+    def _calibration_images(self, limit: int = 100) -> list:
+        """List up to `limit` image paths from the calibration directory"""
+        if not os.path.isdir(self.calibration_dir):
+            return []
+        
+        extensions = (".jpg", ".jpeg", ".png", ".bmp")
+        paths = [
+            os.path.join(self.calibration_dir, name)
+            for name in sorted(os.listdir(self.calibration_dir))
+            if name.lower().endswith(extensions)
+        ]
+        return paths[:limit]
+    
+    def _representative_dataset(self, image_paths: list):
+        """Yield preprocessed calibration tiles for post-training quantization"""
+        for path in image_paths:
+            bgr_image = cv2.imread(path)
+            if bgr_image is None:
+                continue
+            yield [self.preprocess_for_model(bgr_image).copy()]
+    
+    def _convert_to_tflite(self, quantize: bool = False):
+        """
+        Convert the Keras .h5 model to TFLite and cache it next to the original.
+        
+        With `quantize`, weights and activations are quantized to int8 using the
+        calibration images, keeping a float32 output for the probabilities.
+        """
+        keras_model = tf.keras.models.load_model(self.model_path)
+        converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+        
+        if quantize:
+            image_paths = self._calibration_images()
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = lambda: self._representative_dataset(image_paths)
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            converter.inference_input_type = tf.int8
+            converter.inference_output_type = tf.float32
+            output_path = self.int8_tflite_path
+        else:
+            output_path = self.tflite_path
+        
+        tflite_model = converter.convert()
+        
+        # Write atomically so concurrent processes never load a partial file
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(tflite_model)
+        os.replace(tmp_path, output_path)
+        logger.info(f"Converted mobilenet_final.h5 to TFLite at {output_path}")
+    
+    def _tflite_is_stale(self, path: str) -> bool:
+        """Check whether a cached TFLite model is missing or older than the .h5"""
+        if not os.path.exists(path):
+            return True
+        return os.path.getmtime(path) < os.path.getmtime(self.model_path)
+    
+    def prepare_tflite_model(self) -> str:
+        """
+        Make sure a TFLite model is available and return its path.
+        
+        The int8 model is preferred; it is only built when calibration images
+        are present, otherwise the float32 conversion is used.
+        """
+        if not self._tflite_is_stale(self.int8_tflite_path):
+            return self.int8_tflite_path
+        
+        if self._calibration_images():
+            self._convert_to_tflite(quantize=True)
+            return self.int8_tflite_path
+        
+        # int8 is opt-in: it needs calibration images supplied by the deployment
+        logger.info(f"No calibration images in {self.calibration_dir}, using float32 TFLite model")
+        if self._tflite_is_stale(self.tflite_path):
+            self._convert_to_tflite()
+        return self.tflite_path
+    
+    def _create_interpreter(self, tflite_path: str, batch_size: int):
+        """Create a TFLite interpreter with its input allocated for a fixed batch size"""
+        interpreter = tf.lite.Interpreter(
+            model_path=tflite_path,
+            num_threads=int(os.environ.get("MODEL_NUM_THREADS", os.cpu_count()))
+        )
+        if batch_size != 1:
+            # The converted model has a dynamic batch dimension
+            input_index = interpreter.get_input_details()[0]["index"]
+            interpreter.resize_tensor_input(input_index, [batch_size, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE, 3])
+        interpreter.allocate_tensors()
+        return interpreter
     
     def load_model(self):
-        """Load the TensorFlow model for skin condition analysis."""
-        if self._model is None:
-            try:
-                self._model = tf.keras.models.load_model(self.model_path)
-                logger.info("Skin condition model loaded successfully from mobilenet_final.h5")
-            except Exception as e:
-                logger.error(f"Failed to load skin condition model: {str(e)}")
-                raise ValueError(f"Model loading failed: {str(e)}")
+        """Load the TFLite interpreter for skin condition analysis."""
+        if self._model is not None:
+            return self._model
+        
+        with self._model_lock:
+            if self._model is None:
+                try:
+                    tflite_path = self.prepare_tflite_model()
+                    interpreter = self._create_interpreter(tflite_path, batch_size=1)
+                    
+                    input_details = interpreter.get_input_details()[0]
+                    self._input_index = input_details["index"]
+                    self._output_index = interpreter.get_output_details()[0]["index"]
+                    self._tflite_model_path = tflite_path
+                    self._interpreters = {1: interpreter}
+                    # (scale, zero_point) for int8 input, None for float32 input
+                    if input_details["dtype"] == np.int8:
+                        self._input_quantization = input_details["quantization"]
+                    self._model = interpreter
+                    logger.info(f"Skin condition model loaded successfully from {os.path.basename(tflite_path)}")
+                except Exception as e:
+                    logger.error(f"Failed to load skin condition model: {str(e)}")
+                    raise ValueError(f"Model loading failed: {str(e)}")
         return self._model
     
-    def preprocess_for_model(self, rgb_image: np.ndarray) -> tf.Tensor:
-        """Apply MobileNet standard preprocessing"""
-        # Convert numpy array to tensor
-        img = tf.convert_to_tensor(rgb_image, dtype=tf.float32)
+    def _fill_input_tensor(self, input_tensor: np.ndarray, preprocessed_batch: np.ndarray):
+        """Copy a preprocessed batch into the interpreter's input tensor, quantizing if needed"""
+        if self._input_quantization is None:
+            input_tensor[...] = preprocessed_batch
+            return
         
-        # Resize to model input size (224x224)
-        img = tf.image.resize(img, [224, 224])
+        scale, zero_point = self._input_quantization
+        quantized = np.round(preprocessed_batch / scale + zero_point)
+        np.clip(quantized, -128, 127, out=quantized)
+        input_tensor[...] = quantized
+    
+    def preprocess_for_model(self, bgr_image: np.ndarray) -> np.ndarray:
+        """
+        Apply MobileNet standard preprocessing to a BGR image.
+        
+        The result is a thread-local buffer that is overwritten by the next
+        call in the same thread; copy it if it must outlive that.
+        """
+        # Resize to model input size (224x224) while still uint8
+        size = MODEL_INPUT_SIZE
+        resized = _scratch_buffer("resized_bgr", (size, size, 3), np.uint8)
+        cv2.resize(bgr_image, (size, size), dst=resized, interpolation=cv2.INTER_AREA)
         
-        # MobileNet standard preprocessing: normalize to [-1, 1] range
-        img = tf.cast(img, tf.float32)
-        img = (img / 127.5) - 1.0  # Scale to [-1, 1] instead of [0, 1]
+        # The model was trained on RGB; convert only the small tile
+        rgb = _scratch_buffer("resized_rgb", (size, size, 3), np.uint8)
+        cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=rgb)
         
-        # Add batch dimension
-        img = tf.expand_dims(img, axis=0)
+        # MobileNet standard preprocessing: normalize to [-1, 1] range,
+        # written straight into the (1, 224, 224, 3) batch buffer
+        img = _scratch_buffer("input_f32", (1, size, size, 3), np.float32)
+        np.multiply(rgb, np.float32(1.0 / 127.5), out=img[0], dtype=np.float32)
+        img -= 1.0
         
         return img
     
-    def predict_classes(self, rgb_image: np.ndarray) -> np.ndarray:
-        """Get prediction probabilities from the model using RGB image array"""
-        # Convert RGB back to BGR for skin detection (OpenCV format)
-        bgr_image = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2BGR)
-        
+    def prepare_input(self, bgr_image: np.ndarray) -> np.ndarray:
+        """Check a BGR image for skin and preprocess it into a (1, 224, 224, 3) model input"""
         # Check if skin is present in the image
         if not detect_skin_in_image(bgr_image):
             raise ValueError("No skin detected in the image")
         
-        model = self.load_model()
-        
         # Apply model-specific preprocessing
-        preprocessed_img = self.preprocess_for_model(rgb_image)
+        return self.preprocess_for_model(bgr_image)
+    
+    def _interpreter_for(self, batch_size: int):
+        """Get the interpreter for a batch size, creating it on first use (call with _inference_lock held)"""
+        interpreter = self._interpreters.get(batch_size)
+        if interpreter is None:
+            interpreter = self._create_interpreter(self._tflite_model_path, batch_size)
+            self._interpreters[batch_size] = interpreter
+        return interpreter
+    
+    def run_inference(self, preprocessed_batch: np.ndarray) -> np.ndarray:
+        """Run the model on a preprocessed (N, 224, 224, 3) batch and return (N, classes) probabilities"""
+        if self._model is None:
+            self.load_model()
+        
+        # Split the batch into chunks of the fixed sizes (e.g. 7 -> 4 + 2 + 1);
+        # per-image cost is flat, so this wastes nothing, unlike padding
+        chunks = []
+        start = 0
+        remaining = preprocessed_batch.shape[0]
+        while remaining:
+            size = max(s for s in INFERENCE_BATCH_SIZES if s <= remaining)
+            chunks.append(preprocessed_batch[start:start + size])
+            start += size
+            remaining -= size
         
-        # Get predictions
-        preds = model.predict(preprocessed_img)
+        preds = []
+        with self._inference_lock:
+            for chunk in chunks:
+                interpreter = self._interpreter_for(chunk.shape[0])
+                # Write straight into the interpreter's input memory instead of
+                # going through set_tensor. The view must not outlive this call,
+                # since invoke() refuses to run while one is held
+                self._fill_input_tensor(interpreter.tensor(self._input_index)(), chunk)
+                interpreter.invoke()
+                preds.append(interpreter.get_tensor(self._output_index))
+        
+        return preds[0] if len(preds) == 1 else np.concatenate(preds)
+    
+    def predict_classes(self, bgr_image: np.ndarray) -> np.ndarray:
+        """Get prediction probabilities from the model using BGR image array (OpenCV format)"""
+        preds = self.run_inference(self.prepare_input(bgr_image))
         
         # Return probabilities (assuming model outputs probabilities, not logits)
         return preds[0]
     
     def get_predictions_dict(self, probabilities: np.ndarray) -> Dict[str, Any]:
-        """Convert model probabilities to formatted predictions dictionary"""
-        # Create sorted predictions with probabilities as percentages
-        sorted_preds = sorted(
-            [(self.index_to_label[i], float(probabilities[i]) * 100) for i in range(len(probabilities))],
-            key=lambda x: x[1],
-            reverse=True
-        )
+        """
+        Convert model probabilities to formatted predictions dictionary.
+        
+        Labels are stripped and percentages are rounded to 2 decimals.
+        """
+        # Sort by probability (descending) and scale to percentages
+        pct = np.asarray(probabilities, dtype=np.float64) * 100.0
+        order = np.argsort(-pct, kind="stable")
+        rounded = np.round(pct[order], 2).tolist()
+        sorted_preds = [(self._labels[i], prob) for i, prob in zip(order, rounded)]
         
-        predictions_list = [f"{label}: {prob:.2f}%" for label, prob in sorted_preds]
-        top_prediction = sorted_preds[0]
-        all_predictions = {label: prob for label, prob in sorted_preds}
+        top_label, top_prob = sorted_preds[0]
         
         return {
-            "top_condition": top_prediction[0],
-            "confidence": top_prediction[1],  # Percentage value
-            "all_conditions": all_predictions,
-            "condition_list": predictions_list,
+            "top_condition": top_label,
+            "confidence": top_prob,  # Percentage value
+            "all_conditions": dict(sorted_preds),
+            "condition_list": [f"{label}: {prob:.2f}%" for label, prob in sorted_preds],
             "sorted_predictions": sorted_preds
         }
 